@@ -2,28 +2,66 @@
 ''' Run cool maze generating algorithms. '''
 import random
 
+_UNSET = object()  # Fills Markup.marks slots that have never been given a value
+
 class Cell:
     ''' Represents a single cell of a maze.  Cells know their neighbors
         and know if they are linked (connected) to each.  Cells have
         four potential neighbors, in NSEW directions.
     '''  
-    def __init__(self, row, column):
+    # No per-instance __dict__: a large grid holds a lot of cells.
+    __slots__ = ('grid', 'row', 'column', 'index', 'nbrs', '_neighbors')
+
+    N, S, E, W = 0, 1, 2, 3
+    OPPOSITE = (1, 0, 3, 2)
+    DELTA = ((-1, 0), (1, 0), (0, 1), (0, -1))   # (row, column) step for N, S, E, W
+
+    def __init__(self, grid, row, column):
         assert row >= 0
         assert column >= 0
+        self.grid = grid
         self.row = row
         self.column = column
-        self.links = {}
-        self.north = None
-        self.south = None
-        self.east  = None
-        self.west  = None
+        self.index = row * grid.num_columns + column   # Position in grid.walls
+        self.nbrs = [None] * 4     # Neighbors indexed by N, S, E, W
+        self._neighbors = ()       # Filled in by Grid.connect_cells
+
+    @property
+    def mask(self):
+        ''' Bit d is set when linked in direction d.  The bits live in the
+            grid's walls array; a cell is only a view onto them.
+        '''
+        return self.grid.walls[self.index]
+
+    @property
+    def north(self):
+        return self.nbrs[Cell.N]
+
+    @property
+    def south(self):
+        return self.nbrs[Cell.S]
+
+    @property
+    def east(self):
+        return self.nbrs[Cell.E]
+
+    @property
+    def west(self):
+        return self.nbrs[Cell.W]
+
+    def direction_to(self, cell):
+        ''' Return which of N, S, E, W the neighboring cell lies in.'''
+        assert isinstance(cell, Cell)
+        if cell.row == self.row:
+            d = Cell.E if cell.column > self.column else Cell.W
+        else:
+            d = Cell.S if cell.row > self.row else Cell.N
+        assert self.nbrs[d] is cell
+        return d
         
     def link(self, cell, bidirectional=True):
         ''' Carve a connection to another cell (i.e. the maze connects them)'''
-        assert isinstance(cell, Cell)
-        self.links[cell] = True
-        if bidirectional:
-            cell.link(self, bidirectional=False)
+        self.grid.link(self.row, self.column, self.direction_to(cell), bidirectional)
         
     def unlink(self, cell, bidirectional=True):
         ''' Remove a connection to another cell (i.e. the maze 
@@ -32,46 +70,28 @@ class Cell:
             Argument bidirectional is here so that I can call unlink on either
             of the two cells and both will be unlinked.
         '''
-        assert isinstance(cell, Cell)
-        #del self.links[cell]
-        self.links[cell]=False
-        if bidirectional:
-            cell.unlink(self, bidirectional=False)
+        self.grid.unlink(self.row, self.column, self.direction_to(cell), bidirectional)
             
     def is_linked(self, cell):
         ''' Test if this cell is connected to another cell.
             
             Returns: True or False
         '''
-        assert isinstance(cell, Cell)
-        return self.links[cell]
+        return bool(self.grid.walls[self.index] & (1 << self.direction_to(cell)))
         
     def all_links(self):
         ''' Return a list of all cells that we are connected to.'''
-        return self.links
+        return [self.nbrs[d] for d in range(4) if self.mask & (1 << d)]
         
     def link_count(self):
         ''' Return the number of cells that we are connected to.'''
-        i=0
-        for item in self.links.values():
-            if item==True:
-                i=i+1
-        return i
+        return bin(self.mask).count('1')
         
     def neighbors(self):
-        ''' Return a list of all geographical neighboring cells, regardless
+        ''' Return a tuple of all geographical neighboring cells, regardless
             of any connections.  Only returns actual cells, never a None.
         '''
-        result=[]
-        if self.north != None:
-            result.append(self.north)
-        if self.south != None:
-            result.append(self.south)
-        if self.east != None:
-            result.append(self.east)
-        if self.west != None:
-            result.append(self.west)
-        return result
+        return self._neighbors
                 
     def __str__(self):
         return f'Cell at {self.row}, {self.column}'
@@ -82,15 +102,38 @@ class Grid:
         rectangular collection, with equal numbers of columns in each
         row and vis versa.
     '''
+    # What __str__ draws to the east of and below a cell, by its walls mask
+    EAST_SEGMENT = tuple(' ' if m & (1 << Cell.E) else '|' for m in range(16))
+    SOUTH_SEGMENT = tuple('   +' if m & (1 << Cell.S) else '---+' for m in range(16))
     
     def __init__(self, num_rows, num_columns):
         assert num_rows > 0
         assert num_columns > 0
         self.num_rows = num_rows
         self.num_columns = num_columns
+        # Bitmask of open (linked) sides for every cell, stored row-major.
+        self.walls = bytearray(num_rows * num_columns)
+        self.edges = self.create_edges()
         self.grid = self.create_cells()
         self.connect_cells()
         
+    def create_edges(self):
+        ''' List every pair of neighboring cells exactly once, as a tuple of
+            (index, neighbor index, direction from the first to the second).
+            Indexes are row-major, like walls, and the direction is always
+            S or E.  Algorithms can walk or shuffle this list instead of
+            checking each cell's four sides.
+        '''
+        edges=[]
+        for i in range(self.num_rows):
+            for j in range(self.num_columns):
+                u=i*self.num_columns+j
+                if j!=self.num_columns-1:
+                    edges.append((u,u+1,Cell.E))
+                if i!=self.num_rows-1:
+                    edges.append((u,u+self.num_columns,Cell.S))
+        return edges
+        
     def create_cells(self):
         ''' Call the cells into being.  Keep track of them in a list
             for each row and a list of all rows (i.e. a 2d list-of-lists).
@@ -101,44 +144,47 @@ class Grid:
         grid=[[0 for i in range(self.num_columns)] for j in range (self.num_rows)]
         for i in range(self.num_rows):
             for j in range(self.num_columns):
-                grid[i][j]=Cell(i,j)
+                grid[i][j]=Cell(self,i,j)
         return grid
             
     def connect_cells(self):
         ''' Now that all the cells have been created, connect them to 
             each other. 
         '''
-        for i in range(self.num_rows):
-            for j in range(self.num_columns):
-                if i!=self.num_rows-1:
-                    self.grid[i][j].link(self.grid[i+1][j])
-                    self.grid[i][j].south=self.grid[i+1][j]
-                if i!=0:
-                    self.grid[i][j].link(self.grid[i-1][j])
-                    self.grid[i][j].north=self.grid[i-1][j]
-                if j!=self.num_columns-1:
-                    self.grid[i][j].link(self.grid[i][j+1])
-                    self.grid[i][j].east=self.grid[i][j+1]
-                if j!=0:
-                    self.grid[i][j].link(self.grid[i][j-1])
-                    self.grid[i][j].west=self.grid[i][j-1]
-    def unlink_all(self):
-        for i in range(self.num_rows):
-            for j in range(self.num_columns):
-                if i!=self.num_rows-1:
-                    self.grid[i][j].unlink(self.grid[i+1][j])
-                    
-                if i!=0:
-                    self.grid[i][j].unlink(self.grid[i-1][j])
-                    
-                if j!=self.num_columns-1:
-                    self.grid[i][j].unlink(self.grid[i][j+1])
-                    
-                if j!=0:
-                    self.grid[i][j].unlink(self.grid[i][j-1])
+        walls=self.walls
+        cells=[cell for row in self.grid for cell in row]
+        for u,v,d in self.edges:
+            back=Cell.OPPOSITE[d]
+            cells[u].nbrs[d]=cells[v]
+            cells[v].nbrs[back]=cells[u]
+            walls[u]|=1<<d
+            walls[v]|=1<<back
+        # A cell's geographic neighbors never change, so build them once.
+        for cell in self.each_cell():
+            cell._neighbors = tuple(n for n in cell.nbrs if n is not None)
+
+    def link(self, row, column, direction, bidirectional=True):
+        ''' Open the wall on one side of the cell at row/column.'''
+        dr, dc = Cell.DELTA[direction]
+        assert 0 <= row + dr < self.num_rows and 0 <= column + dc < self.num_columns
+        walls = self.walls
+        walls[row * self.num_columns + column] |= 1 << direction
+        if bidirectional:
+            walls[(row + dr) * self.num_columns + column + dc] |= 1 << Cell.OPPOSITE[direction]
+
+    def unlink(self, row, column, direction, bidirectional=True):
+        ''' Close the wall on one side of the cell at row/column.'''
+        dr, dc = Cell.DELTA[direction]
+        assert 0 <= row + dr < self.num_rows and 0 <= column + dc < self.num_columns
+        walls = self.walls
+        walls[row * self.num_columns + column] &= ~(1 << direction)
+        if bidirectional:
+            walls[(row + dr) * self.num_columns + column + dc] &= ~(1 << Cell.OPPOSITE[direction])
 
+    def unlink_all(self):
+        ''' Close every wall in the maze.'''
+        self.walls[:] = bytes(len(self.walls))
 
-                    
     def cell_at(self, row, column):
         ''' Retrieve the cell at a particular row/column index.'''
         return self.grid[row][column]
@@ -147,12 +193,10 @@ class Grid:
         ''' Return a list of all cells that are deadends (i.e. only link to
             one other cell).
         '''
-        result=[]
-        for i in range(self.num_rows):
-            for j in range(self.num_columns):
-                if self.grid[i][j].link_count()==1:
-                    result.append(self.grid[i][j])
-        return result
+        # each_cell() runs in the same row-major order as walls.  m & (m - 1)
+        # clears the lowest set bit, so it is zero when exactly one is set.
+        return [cell for cell, m in zip(self.each_cell(), self.walls)
+                if m and not m & (m - 1)]
                             
     def each_cell(self):
         ''' A generator.  Each time it is called, it will return one of 
@@ -187,28 +231,16 @@ class Grid:
         self.markup = markup
         
     def __str__(self):
-        ret_val = '+' + '---+' * self.num_columns + '\n'
+        walls = self.walls
+        markup = self.markup
+        east = Grid.EAST_SEGMENT
+        south = Grid.SOUTH_SEGMENT
+        parts = ['+' + '---+' * self.num_columns]
         for row in self.grid:
-            ret_val += '|'
-            for cell in row:
-                cell_value = self.markup[cell]
-                ret_val += '{:^3s}'.format(str(cell_value))
-                if not cell.east:
-                    ret_val += '|'
-                elif cell.east.is_linked(cell):
-                    ret_val += ' '
-                else:
-                    ret_val += '|'
-            ret_val += '\n+'
-            for cell in row:
-                if not cell.south:
-                    ret_val += '---+'
-                elif cell.south.is_linked(cell):
-                    ret_val += '   +'
-                else:
-                    ret_val += '---+'
-            ret_val += '\n'
-        return ret_val
+            parts.append('|' + ''.join('{:^3s}'.format(str(markup[cell])) + east[walls[cell.index]]
+                                       for cell in row))
+            parts.append('+' + ''.join(south[walls[cell.index]] for cell in row))
+        return '\n'.join(parts) + '\n'
         
 class Markup:
     ''' A Markup is a way to add data to a grid.  It is associated with
@@ -221,43 +253,52 @@ class Markup:
     
     def __init__(self, grid, default=' '):
         self.grid = grid
-        self.marks = {}  # Key: cell, Value = some object
         self.default = default
+        self.reset()
         
     def reset(self):
-        self.marks = {}
+        # Index: cell.index (row-major, like grid.walls), Value = some object
+        self.marks = [_UNSET] * self.grid.size()
         
     def __setitem__(self, cell, value):
-        self.marks[cell] = value
+        self.marks[cell.index] = value
         
     def __getitem__(self, cell):
-        return self.marks.get(cell, self.default)
+        value = self.marks[cell.index]
+        return self.default if value is _UNSET else value
         
     def set_item_at(self, row, column, value):
         assert row >= 0 and row < self.grid.num_rows
         assert column >= 0 and column < self.grid.num_columns
-        cell = self.grid.cell_at(row, column)
-        if cell:
-            self.marks[cell]=value
-        else:
-            raise IndexError
+        self.marks[row * self.grid.num_columns + column] = value
     
     def get_item_at(self, row, column):
+        ''' Return the value at row/column, or the default if that cell
+            has never been given one.
+        '''
         assert row >= 0 and row < self.grid.num_rows
         assert column >= 0 and column < self.grid.num_columns
-        cell = self.grid.cell_at(row, column)
-        if cell:
-            return self.marks.get(cell)
-        else:
-            raise IndexError
+        value = self.marks[row * self.grid.num_columns + column]
+        return self.default if value is _UNSET else value
             
     def max(self):
-        ''' Return the cell with the largest markup value. '''
-        return max(self.marks.keys(), key=self.__getitem__)
+        ''' Return the cell with the largest markup value.  Only cells that
+            have been given a value are considered.
+        '''
+        return self._cell_for(max(self._set_indexes(), key=self.marks.__getitem__))
 
     def min(self):
-        ''' Return the cell with the largest markup value. '''
-        return min(self.marks.keys(), key=self.__getitem__)
+        ''' Return the cell with the smallest markup value.  Only cells that
+            have been given a value are considered.
+        '''
+        return self._cell_for(min(self._set_indexes(), key=self.marks.__getitem__))
+
+    def _set_indexes(self):
+        return [i for i, value in enumerate(self.marks) if value is not _UNSET]
+
+    def _cell_for(self, index):
+        row, column = divmod(index, self.grid.num_columns)
+        return self.grid.cell_at(row, column)
 
 class DijkstraMarkup(Markup):
     ''' A markup class that will run Djikstra's algorithm and keep track
@@ -273,44 +314,16 @@ class DijkstraMarkup(Markup):
 
 
     def algorithm(self):
-        self.set_item_at(self.root_cell.row,self.root_cell.column,0)
-        visited=[]
-        frontier=[]
-        frontier.append(self.root_cell)
-        visited.append(self.root_cell)
-        count=0
-        while len(visited)<=self.grid.size():
-            if len(visited)==self.grid.size():
-                break
-            a=999999
-            for item in frontier:
-                i=self.marks.get(item)
-                if i<=a:
-                    a=i
-                    c=item
-            frontier.remove(c)
-            print("popped:{0} at value of {1}".format(c,a))
-            if visited.count(c.north)==0 and c.north!=None and c.links.get(c.north)==True:
-                visited.append(c.north)
-                self.marks[c.north]=a+1
-                frontier.append(c.north)
-
-            if visited.count(c.south)==0 and c.south!=None and c.links.get(c.south)==True:
-                visited.append(c.south)
-                self.marks[c.south]=a+1
-                frontier.append(c.south)
-
-            if visited.count(c.west)==0 and c.west!=None and c.links.get(c.west)==True:
-                visited.append(c.west)
-                self.marks[c.west]=a+1
-                frontier.append(c.west)
-
-            if visited.count(c.east)==0 and c.east!=None and c.links.get(c.east)==True:
-                visited.append(c.east)
-                self.marks[c.east]=a+1
-                frontier.append(c.east)
-
-            count=count+1
+        ''' Every passage in a maze has the same length, so Dijkstra's
+            algorithm reduces to a breadth-first search.  It runs on the
+            grid's walls array, keeping distances in a flat list indexed
+            like the walls (-1 for cells that can't be reached).
+        '''
+        grid=self.grid
+        dist=[-1]*grid.size()
+        count=_bfs(grid.walls, grid.num_rows, grid.num_columns, self.root_cell.index, dist)
+        self.distances=dist
+        self.marks=[d if d>=0 else _UNSET for d in dist]
         print("done markup in {0} steps".format(count))
 
             
@@ -320,46 +333,87 @@ class DijkstraMarkup(Markup):
             
             Returns: Tuple of (cell, distance)
         '''
-        a=0
-        cell=None
-        for item in self.marks:
-            i=self.marks[item]
-            if i>a:
-                a=i
-                cell=item
+        a=max(self.distances)
+        return self._cell_for(self.distances.index(a)),a
+
 
-        return cell,a
+def _bfs(walls, num_rows, num_columns, root, dist):
+    ''' Breadth-first search kernel over a grid's walls array.  dist must
+        hold -1 for every cell; on return it holds each reachable cell's
+        distance from root.  The queue is a preallocated list walked with
+        head/tail indices, since every cell is enqueued at most once.
+        A wall bit is only ever set towards a real neighbor, so the open
+        sides double as the bounds check.
 
+        Returns: the number of cells reached.
+    '''
+    queue=[0]*(num_rows*num_columns)
+    queue[0]=root
+    dist[root]=0
+    head,tail=0,1
+    north,south,east,west=1<<Cell.N,1<<Cell.S,1<<Cell.E,1<<Cell.W
+    while head<tail:
+        u=queue[head]
+        head=head+1
+        w=walls[u]
+        du=dist[u]+1
+        if w & north and dist[u-num_columns]<0:
+            dist[u-num_columns]=du
+            queue[tail]=u-num_columns
+            tail=tail+1
+        if w & south and dist[u+num_columns]<0:
+            dist[u+num_columns]=du
+            queue[tail]=u+num_columns
+            tail=tail+1
+        if w & east and dist[u+1]<0:
+            dist[u+1]=du
+            queue[tail]=u+1
+            tail=tail+1
+        if w & west and dist[u-1]<0:
+            dist[u-1]=du
+            queue[tail]=u-1
+            tail=tail+1
+    return tail
+
+def _farthest_from(grid, cell):
+    ''' Run _bfs from cell and return the cell farthest away from it.'''
+    dist=[-1]*grid.size()
+    _bfs(grid.walls, grid.num_rows, grid.num_columns, cell.index, dist)
+    row,column=divmod(dist.index(max(dist)), grid.num_columns)
+    return grid.cell_at(row,column)
 
 class ShortestPathMarkup(DijkstraMarkup):
     ''' Given a starting cell and a goal cell, create a Markup that will
         have the shortest path between those two cells marked.  
+        Pass verbose=True to print the distances and each step of the path.
     '''
 
     def __init__(self, grid, start_cell, goal_cell, 
-                 path_marker='*', non_path_marker=' '):
+                 path_marker='*', non_path_marker=' ', verbose=False):
         super().__init__(grid, start_cell)
         path=[]
         path.append(goal_cell)
         i=None
         i_item=goal_cell
-        print(self.marks)
+        if verbose:
+            print(self.marks)
         while(i!=0):
             i=9999
             temp=None
             for item in i_item.neighbors():
-                if i_item.links[item]:
-                    a=self.marks[item]
+                if i_item.is_linked(item):
+                    a=self[item]
                     if a<i:
                         i=a
                         temp=item
             i_item=temp
             path.append(i_item)
-            print("path to {0}".format(i_item))
+            if verbose:
+                print("path to {0}".format(i_item))
         for item in path:
-            self.marks[item]=path_marker
-        self.marks[path[0]]="-"
-        self.marks[path[len(path)-1]]="-"
+            self[item]=path_marker
+        self[path[0]]="-"
+        self[path[len(path)-1]]="-"
         print("finished Shortest Path Markup in len: {0}".format(len(path)))
         
 
@@ -370,13 +424,12 @@ class LongestPathMarkup(ShortestPathMarkup):
               This markup is the longest path to be found _anywhere_ in the maze.
     '''
 
-    def __init__(self, grid, path_marker='*', non_path_marker=' '):
+    def __init__(self, grid, path_marker='*', non_path_marker=' ', verbose=False):
         start_cell = grid.random_cell()
-        dm = DijkstraMarkup(grid, start_cell)
-        farthest, _ = dm.farthest_cell()
-        dm = DijkstraMarkup(grid, farthest)
-        next_farthest, _ = dm.farthest_cell()   
-        super().__init__(grid, farthest, next_farthest, path_marker, non_path_marker)
+        farthest = _farthest_from(grid, start_cell)
+        next_farthest = _farthest_from(grid, farthest)
+        super().__init__(grid, farthest, next_farthest, path_marker, non_path_marker,
+                         verbose)
 
 class ColorizedMarkup(Markup):
     ''' Markup a maze with various colors.  Each value in the markup is
@@ -406,17 +459,22 @@ class ColorizedMarkup(Markup):
         '''
         max = markup.max()
         max_value = markup[max]
-        for c in self.grid.each_cell():
-            cell_value = markup[c]
-            intensity = (max_value - cell_value) / max_value
-            dark   = round(255 * intensity)
-            bright = round(127 * intensity) + 128
-            if self.channel == 'R':
-                self.marks[c] = [bright, dark, dark]
-            elif self.channel == 'G':
-                self.marks[c] = [dark, bright, dark]
-            else:
-                self.marks[c] = [dark, dark, bright]   
+        channel = 'RGB'.index(self.channel)
+        colors = {}  # Key: markup value, Value = RGB triplet for it
+        marks = self.marks
+        for i, cell_value in enumerate(markup.marks):
+            if cell_value is _UNSET:
+                cell_value = markup.default
+            color = colors.get(cell_value)
+            if color is None:
+                # Only computed once per distinct value (e.g. per distance)
+                intensity = (max_value - cell_value) / max_value
+                dark   = round(255 * intensity)
+                bright = round(127 * intensity) + 128
+                color = [dark, dark, dark]
+                color[channel] = bright
+                colors[cell_value] = color
+            marks[i] = color
                                        
 def binary_tree(grid):
     ''' The Binary Tree Algorithm.
@@ -433,26 +491,22 @@ def binary_tree(grid):
     while(i>=0):
         j=0
         while(j<=grid.num_columns-1):
-            #if grid.cell_at(i,j).north==None:
+            c=grid.cell_at(i,j)
             if i==0 and j==grid.num_columns-1:
-                print()
+                pass  # The northeast corner has nothing to link to
             elif i==0:
-                grid.cell_at(i,j).link(grid.cell_at(i,j+1))
-            #if grid.cell_at(i,j).east==None:
+                c.link(c.east)
             elif j==grid.num_columns-1:
-                grid.cell_at(i,j).link(grid.cell_at(i-1,j))
+                c.link(c.north)
             else:
                 r=random.randint(0,1)
                 if r==0:
-                    #grid.cell_at(i,j).link(grid.cell_at(i-1,j))
-                    grid.cell_at(i,j).unlink(grid.cell_at(i,j+1))
+                    c.unlink(c.east)
                 if r==1:
-                    #grid.cell_at(i,j).link(grid.cell_at(i,j+1))
-                    grid.cell_at(i,j).unlink(grid.cell_at(i-1,j))
+                    c.unlink(c.north)
             j=j+1
         i=i-1
 
-
     print("finish binary")
 
             
@@ -481,11 +535,8 @@ def sidewinder(grid, odds=.5):
         j=0
         run=[]
         while(j<=grid.num_columns-1):
-            r=random.randrange(0,10,1)/10
-            if(r<=odds and j!=grid.num_columns-1):
-                run.append(grid.cell_at(i,j))
-            else:
-                run.append(grid.cell_at(i,j))
+            run.append(grid.cell_at(i,j))
+            if(random.random()>odds or j==grid.num_columns-1):
                 r1=random.randrange(0,len(run))
                 for a in range(len(run)):
                     if(j!=grid.num_columns-1):
@@ -507,7 +558,17 @@ def sidewinder(grid, odds=.5):
         i=i-1
     print("finish sidewinder")
                 
-def aldous_broder(grid):
+def _random_draws(batch_size=65536):
+    ''' A generator of random integers in the range 0-11, produced a batch
+        at a time from random.randbytes() so the random walks below don't
+        pay for a random module call on every step.  12 is divisible by 2,
+        3 and 4, so draw % len(neighbors) picks uniformly among a cell's
+        neighbors.  Bytes of 252 and up are dropped to keep draws unbiased.
+    '''
+    while True:
+        yield from [b % 12 for b in random.randbytes(batch_size) if b < 252]
+
+def aldous_broder(grid, verbose=False):
     ''' The Aldous-Broder algorithm is a random-walk algorithm.
     
         Start in a random cell.  Choose a random direction.  If the cell
@@ -516,6 +577,8 @@ def aldous_broder(grid):
         Move to that randomly chosen cell, regardless of whether it was
         linked or not.
         Continue until all cells have been visited.
+
+        If verbose is True, print each cell as the walk arrives at it.
     '''
     grid.unlink_all()
     linked_cells={}
@@ -523,51 +586,19 @@ def aldous_broder(grid):
     r1=random.randrange(0,grid.num_rows)
     r2=random.randrange(0,grid.num_columns)
     next_cell=grid.cell_at(r1,r2)
-    while(len(linked_cells)<=grid.size()):
+    draws=_random_draws()
+    linked_cells[next_cell]=next_cell
+    # Check for completion before each step: a 1x1 grid has no neighbors to step to
+    while(len(linked_cells)<grid.size()):
         iteration_count=iteration_count+1
-        if(len(linked_cells)==grid.size()):
-            break
+        if verbose:
+            print(next_cell)
+        cell=next_cell
+        neighbors=cell._neighbors
+        next_cell=neighbors[next(draws) % len(neighbors)]
         if(linked_cells.get(next_cell,1)==1):
+            cell.link(next_cell)
             linked_cells[next_cell]=next_cell
-        print(next_cell)
-        ct=True
-        if ct:
-            
-            again=True
-            while(again==True):
-                
-                r=random.randint(1,4)
-                cell=next_cell
-                again=False
-                if(r==1 and cell.north!=None):
-                    if(linked_cells.get(cell.north,1)==1):
-                            cell.link(cell.north)
-                    #else:
-                    #        cell.unlink(cell.north)
-                    next_cell=cell.north
-                elif(r==2 and cell.south!=None):
-                    if(linked_cells.get(cell.south,1)==1):
-                            cell.link(cell.south)
-                    #else:
-                    #        cell.unlink(cell.south)
-                    next_cell=cell.south
-                elif(r==3 and cell.east!=None):
-                    if(linked_cells.get(cell.east,1)==1):
-                            cell.link(cell.east)
-                    #else:
-                    #        cell.unlink(cell.east)
-                    next_cell=cell.east
-                elif(r==4 and cell.west!=None):
-                    if(linked_cells.get(cell.west,1)==1):
-                            cell.link(cell.west)
-                    #else:
-                    #       cell.unlink(cell.west)
-                    next_cell=cell.west
-                else:
-                    again=True
-
-
-
 
     print(f'Aldous-Broder executed on a grid of size {grid.size()} in {iteration_count} steps.')
     
@@ -596,7 +627,7 @@ def wilson(grid):
         makes it simpler to choose a random unvisited cell, for instance.   
     '''
     unvisited=[]
-    visited=[]
+    visited=set()
     random_choices=0
     loops_removed=0
     grid.unlink_all()
@@ -604,50 +635,44 @@ def wilson(grid):
     for i in range(grid.num_rows):
         for j in range(grid.num_columns):
             unvisited.append(grid.cell_at(i,j))
+    where={c:i for i,c in enumerate(unvisited)}  # Key: unvisited cell, Value = its index
+
+    def mark_visited(cell):
+        # Move the last unvisited cell into this one's slot so removal is O(1)
+        i=where.pop(cell)
+        last=unvisited.pop()
+        if last is not cell:
+            unvisited[i]=last
+            where[last]=i
+        visited.add(cell)
         
-    a=random.choice(unvisited)
-    unvisited.remove(a)
-    visited.append(a)
+    draws=_random_draws()
+    mark_visited(random.choice(unvisited))
     while(len(visited)<=grid.size()):
         if len(visited)==grid.size():
             break
         start=random.choice(unvisited)
-        path=[]
-        i=0
-        path.append(start)
+        path=[start]
+        pos={start:0}  # Key: cell on the path, Value = its index in path
         q=False
         while q==False:
-            i=i+1
-            redo=True
-            while(redo==True):
-                r = random.randint(1,4)
-                random_choices=random_choices+1
-                temp=path[i-1]
-                redo=False
-                if(r==1 and temp.north != None):
-                    path.append(temp.north)
-                elif(r==2 and temp.south != None):
-                    path.append(temp.south)
-                elif(r==3 and temp.east != None):
-                    path.append(temp.east)
-                elif(r==4 and temp.west != None):
-                    path.append(temp.west)
-                else:
-                    redo=True
-            for t in range(len(path)):
-                    if path[t]==path[i]:
-                        for m in range(t+1,i+1):
-                            del path[t+1]
-                        i=t
-                        loops_removed=loops_removed+1
-                        break
-            for item in visited:
-                if path[i]==item:
-                    q=True
-                    break
+            neighbors=path[-1]._neighbors
+            nxt=neighbors[next(draws) % len(neighbors)]
+            random_choices=random_choices+1
+            if nxt in pos:
+                # Erase the loop: chop the path back to where nxt first appeared
+                t=pos[nxt]
+                for c in path[t+1:]:
+                    del pos[c]
+                del path[t+1:]
+                loops_removed=loops_removed+1
+            else:
+                pos[nxt]=len(path)
+                path.append(nxt)
+            if nxt in visited:
+                q=True
         for t in range(0,len(path)-1):
-            visited.append(path[t])
-            unvisited.remove(path[t])
+            mark_visited(path[t])
             path[t].link(path[t+1])
 
 
@@ -672,74 +697,100 @@ def recursive_backtracker(grid, start_cell=None):
         the code will be quite short), but for large mazes you will be making lots of 
         function calls and you risk running out of stack space.
     '''
-    stack=[]
-    visited=[]
     if start_cell==None:
         start_cell=grid.random_cell()
-    i=0
-    stack.append(start_cell)
-    visited.append(start_cell)
     grid.unlink_all()
-    count=0
-    while(len(visited)<=grid.size()):
-        if len(visited)==grid.size():
-            #检查是否有重复
-            for item in visited:
-                i=visited.count(item)
-                if i>1:
-                    print("{0}has repeated for {1}times".format(item,i))
-            break
-        #redo=True
-        print("this loop:{0}".format(stack[i]))
-        #判断四周是否被占用
-        N,S,E,W=False,False,False,False
- 
-        for item in visited:
-                if stack[i].north == item or stack[i].north==None:
-                    N=True
-                    
-                if stack[i].south == item or stack[i].south==None:
-                    S=True
-                    
-                if stack[i].east == item or stack[i].east==None:
-                    E=True
-                    
-                if stack[i].west == item or stack[i].west==None:
-                    W=True
-                    
-        if N==True and S==True and E==True and W==True:
-            print("popped stack{0}".format(stack[i]))
-            stack.pop(i)                    
-            i=len(stack)-1
-            print("now last of order stack{0}".format(stack[i]))
+    count=_rb(grid.walls, grid.num_rows, grid.num_columns, start_cell.index)
+    print("finished recursive algorithm in {0} steps".format(count))
 
-            continue
+def _rb(walls, num_rows, num_columns, start):
+    ''' Recursive backtracker kernel.  Works directly on a grid's walls array
+        (cells addressed by their flat row-major index) so that no Cell
+        objects are touched inside the loop.  A bytearray marks visited
+        cells, making each step O(1).
 
-        #随机选择一个方向(以判断占用）
-        #while(redo==True):
-        #redo=False
-        r=random.randint(1,4)
-        i=len(stack)-1
-        if(r==1 and N==False):
-            stack.append(stack[i].north)
-            visited.append(stack[i].north)
-            stack[i].link(stack[i].north)
-        elif(r==2 and S==False):
-            stack.append(stack[i].south)
-            visited.append(stack[i].south)
-            stack[i].link(stack[i].south)
-        elif(r==3 and E==False):
-            stack.append(stack[i].east)
-            visited.append(stack[i].east)
-            stack[i].link(stack[i].east)
-        elif(r==4 and W==False):
-            stack.append(stack[i].west)
-            visited.append(stack[i].west)
-            stack[i].link(stack[i].west)
-        elif(N==True and S==True and E==True and W==True):
-            print("error")
-
-        i=len(stack)-1
+        Returns: the number of cells carved into the maze.
+    '''
+    visited=bytearray(num_rows*num_columns)
+    visited[start]=1
+    stack=[start]
+    north,south,east,west=1<<Cell.N,1<<Cell.S,1<<Cell.E,1<<Cell.W
+    count=0
+    while stack:
+        u=stack[-1]
+        row,col=divmod(u,num_columns)
+        options=[]
+        if row>0 and not visited[u-num_columns]:
+            options.append((u-num_columns,north,south))
+        if row<num_rows-1 and not visited[u+num_columns]:
+            options.append((u+num_columns,south,north))
+        if col<num_columns-1 and not visited[u+1]:
+            options.append((u+1,east,west))
+        if col>0 and not visited[u-1]:
+            options.append((u-1,west,east))
+        if not options:
+            stack.pop()
+            continue
+        v,side,opposite=random.choice(options)
+        walls[u]|=side
+        walls[v]|=opposite
+        visited[v]=1
+        stack.append(v)
         count=count+1
-    print("finished recursive algorithm in {0} steps".format(count))
+    return count
+
+class UnionFind:
+    ''' A disjoint-set forest over the integers 0..size-1, using union by
+        rank and path halving so each operation is close to O(1).
+    '''
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.rank = bytearray(size)
+
+    def find(self, x):
+        ''' Return the representative of the set holding x. '''
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # Path halving
+            x = parent[x]
+        return x
 
+    def union(self, a, b):
+        ''' Merge the sets holding a and b.
+
+            Returns: True if they were separate sets, False if already joined
+        '''
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+        return True
+
+def kruskal(grid):
+    ''' Kruskal's algorithm builds a minimum spanning tree with random weights.
+
+        1) Close every wall.  Each cell starts out in a set of its own.
+        2) Visit every wall between two cells in a random order.  If the cells
+           on either side are in different sets, remove the wall and merge
+           their sets.  Otherwise the wall would make a loop, so leave it.
+        3) Stop once every cell is in the same set.
+    '''
+    grid.unlink_all()
+    walls=grid.walls
+    edges=list(grid.edges)
+    random.shuffle(edges)
+    sets=UnionFind(grid.size())
+    carved=0
+    for u,v,d in edges:
+        if carved==grid.size()-1:
+            break
+        if sets.union(u,v):
+            walls[u]|=1<<d
+            walls[v]|=1<<Cell.OPPOSITE[d]
+            carved=carved+1
+    print(f'Kruskal executed on a grid of size {grid.size()}, carving {carved} passages.')
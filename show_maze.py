@@ -40,6 +40,9 @@ def main():
                 elif event.key == K_r:  # Recursive Backtracker
                     mazes.recursive_backtracker(g)
                     markup = None
+                elif event.key == K_k:  # Kruskal
+                    mazes.kruskal(g)
+                    markup = None
                 elif event.key == K_l:  # longest path
                     markup = mazes.LongestPathMarkup(g)
                 elif event.key == K_d:  # deadend count and color